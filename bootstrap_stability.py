@@ -0,0 +1,98 @@
+import json
+
+import pandas as pd
+
+from lib.annealing import simulated_annealing_ordering
+from lib.bootstrap import bootstrap_orderings, position_stability
+from lib.correlation import *
+from lib.data_processing import *
+from lib.telemetry import start_recording, stop_recording
+from lib.utils import *
+
+
+def run_bootstrap_stability(
+        N_g = 19,
+        initial_temperature = 1.0,
+        cooling_rate = 0.9997,
+        cut_off = 0.09,
+        n_resamples = 50,
+        block_length = 20,
+        bootstrap_temperature = 0.1,
+        bootstrap_iterations = 200000,
+        trace_memory = False,
+):
+    np.random.seed(42)
+    recorder = start_recording(trace_memory=trace_memory)
+
+    output_folder = create_output_folder('./output', 'bootstrap')
+
+    prices, stock_info = fetch_data(
+        sector_stock_count=50,
+        total_count=None,
+        source=['nasdaq', 'nyse'],
+        data_path='./data',
+        save_path='./data/processed_data.csv',
+        period=10,  # Years
+        interval='1d',
+        start_date='2015-02-09',
+        allow_missing=False,
+        fill_missing=False,
+        raise_errors=True,
+    )
+
+    log_returns = compute_log_returns(prices)
+    correlation_matrix = compute_correlation_matrix(log_returns)
+    corr_eigenvalues, corr_eigenvectors = compute_eigenvalues(correlation_matrix)
+
+    C_g = compute_group_modes(corr_eigenvalues, corr_eigenvectors, N_g)
+    full_order, full_energy, _ = simulated_annealing_ordering(
+        C_g,
+        cutoff=cut_off,
+        initial_temp=initial_temperature,
+        cooling_rate=cooling_rate,
+        iterations=10000000,
+        tol=1e-3,
+        patience=10000,
+        individual_logging=True,
+    )
+
+    # Resamples start from the full-sample order, so anneal them from a lower temperature
+    orders, energies = bootstrap_orderings(
+        log_returns,
+        full_order,
+        N_g,
+        n_resamples=n_resamples,
+        block_length=block_length,
+        cutoff=cut_off,
+        initial_temp=bootstrap_temperature,
+        cooling_rate=cooling_rate,
+        iterations=bootstrap_iterations,
+        tol=1e-3,
+        patience=10000,
+    )
+
+    stability = pd.DataFrame(position_stability(full_order, orders))
+    stability.insert(0, 'Symbol', stock_info['Symbol'].to_list())
+    stability.insert(1, 'Sector', stock_info['Sector'].to_list())
+    stability.to_csv(f'{output_folder}/position_stability.csv', index=False)
+
+    output = {
+        'full_energy': full_energy,
+        'bootstrap_energies': energies.tolist(),
+        'N_g': N_g,
+        'cut_off': cut_off,
+        'n_resamples': n_resamples,
+        'block_length': block_length,
+        'full_order': full_order,
+        'bootstrap_orders': orders.tolist(),
+    }
+
+    with open(f'{output_folder}/bootstrap_output.json', 'w') as f:
+        json.dump(output, f)
+
+    stop_recording()
+    recorder.write(output_folder)
+
+
+if __name__ == '__main__':
+    run_bootstrap_stability()
@@ -1,9 +1,13 @@
 import json
 
 from lib.annealing import simulated_annealing_ordering
+from lib.bound import ordering_lower_bound, optimality_gap
 from lib.correlation import *
 from lib.data_processing import *
 from lib.graphs import *
+from lib.local_search import tabu_insertion_refinement
+from lib.metrics import block_diagonal_metrics, sector_codes
+from lib.telemetry import start_recording, stage, stop_recording
 from lib.utils import *
 
 
@@ -12,8 +16,12 @@ def run_group_correlation(
         initial_temperature = 1.0,
         cooling_rate = 0.9997,
         cut_off = 0.09,
+        refine = True,
+        gap_tolerance = None,
+        trace_memory = False,
 ):
     np.random.seed(42)
+    recorder = start_recording(trace_memory=trace_memory)
 
     output_folder = create_output_folder('./output', 'graphing')
     # output_folder = './output/temp'
@@ -40,6 +48,10 @@ def run_group_correlation(
     corr_eigenvalues, corr_eigenvectors = compute_eigenvalues(correlation_matrix)
 
     C_g = compute_group_modes(corr_eigenvalues, corr_eigenvectors, N_g)
+    with stage('lower_bound'):
+        lower_bound = ordering_lower_bound(C_g, cut_off)
+    logging.info(f'Energy lower bound: {lower_bound:.4f}')
+
     best_order, best_energy, iteration_count, energy_history = simulated_annealing_ordering(
         C_g,
         cutoff=cut_off,
@@ -50,11 +62,32 @@ def run_group_correlation(
         patience=10000,
         return_history=True,
         individual_logging=True,
+        lower_bound=lower_bound,
+        gap_tol=gap_tolerance,
     )
+    annealed_energy = best_energy
+    refinement_moves = 0
+
+    if refine:
+        best_order, best_energy, refinement_moves = tabu_insertion_refinement(
+            C_g,
+            best_order,
+            cutoff=cut_off,
+            iterations=10000,
+            tabu_tenure=10,
+            patience=100,
+        )
+
+    metrics = block_diagonal_metrics(C_g, best_order, sector_codes(sector_map), cutoff=cut_off)
+    metrics['bandwidth_profile'] = metrics['bandwidth_profile'].tolist()
 
     output = {
         'best_energy': best_energy,
+        'annealed_energy': annealed_energy,
         'iteration': iteration_count,
+        'refinement_moves': refinement_moves,
+        'lower_bound': lower_bound,
+        'optimality_gap': optimality_gap(best_energy, lower_bound),
         'N_g': N_g,
         'initial_temperature': initial_temperature,
         'cooling_rate': cooling_rate,
@@ -63,13 +96,18 @@ def run_group_correlation(
         'energy_history': energy_history,
         'stocks_map': stocks_map,
         'sector_map': sector_map,
+        'metrics': metrics,
     }
 
     with open(f'{output_folder}/parameter_selection_output.json', 'w') as f:
         json.dump(output, f)
 
-    plot_heat_map(C_g, best_order, stocks_map, sector_map, output_folder)
-    plot_energy_history(energy_history, output_folder)
+    with stage('plotting'):
+        plot_heat_map(C_g, best_order, stocks_map, sector_map, output_folder)
+        plot_energy_history(energy_history, output_folder)
+
+    stop_recording()
+    recorder.write(output_folder)
 
 
 if __name__ == '__main__':
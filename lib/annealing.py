@@ -1,9 +1,13 @@
 import logging
+import time
 
 import numpy as np
 from numba import njit
 from tqdm import tqdm
 
+from lib.bound import optimality_gap
+from lib.telemetry import active_recorder, instrument, temperature_band
+
 
 def energy(order, C, cutoff):
     """Compute the total energy for a given ordering and correlation matrix C.
@@ -54,6 +58,7 @@ def energy_numba(order, C, cutoff):
     return total
 
 
+@instrument
 def simulated_annealing_ordering(
         C,
         cutoff=0.1,
@@ -63,7 +68,12 @@ def simulated_annealing_ordering(
         tol=5,
         patience=1000,
         return_history=False,
-        individual_logging=False
+        individual_logging=False,
+        lower_bound=None,
+        gap_tol=None,
+        initial_order=None,
+        state=None,
+        return_state=False,
 ):
     """
     Perform simulated annealing to optimise the ordering for block-diagonality.
@@ -73,31 +83,61 @@ def simulated_annealing_ordering(
     initial_temp : starting temperature for annealing.
     cooling_rate : factor by which to multiply the temperature each iteration.
     iterations   : total number of iterations to run.
+    lower_bound  : lower bound on the energy (see lib.bound), used to track the optimality gap.
+    gap_tol      : stop early once the relative gap to lower_bound drops to this value.
+    initial_order: ordering to start from, defaults to (0, 1, 2, ..., n-1).
+    state        : annealer state returned by a previous call, to continue that run
+                   for a further number of iterations (overrides initial_temp and initial_order).
+    return_state : also return the annealer state so the run can be continued later.
 
     Returns:
     best_order   : the optimised ordering (a list of indices).
     best_energy  : energy value corresponding to best_order.
     energy_history: list of energy values (optional, for monitoring).
-    it: number of iterations.
+    it: number of iterations (counted from the start of the run when resuming).
+    state: annealer state (optional, for resuming).
     """
 
     n = C.shape[0]
 
-    # Start with an initial ordering (0, 1, 2, ..., n-1)
-    current_order = list(range(n))
-    current_energy = energy_numba(current_order, C, cutoff)
-    best_order = current_order.copy()
-    best_energy = current_energy
-    temp = initial_temp
+    if state is not None:
+        current_order = list(state['current_order'])
+        current_energy = state['current_energy']
+        best_order = list(state['best_order'])
+        best_energy = state['best_energy']
+        temp = state['temp']
+        no_change_count = state['no_change_count']
+        start = state['iteration']
+    else:
+        # Start with an initial ordering (0, 1, 2, ..., n-1) unless one is given
+        current_order = list(initial_order) if initial_order is not None else list(range(n))
+        current_energy = energy_numba(current_order, C, cutoff)
+        best_order = current_order.copy()
+        best_energy = current_energy
+        temp = initial_temp
+        # Count iterations with negligible change.
+        no_change_count = 0
+        start = 0
+
     energy_history = [current_energy]
+    converged = False
+
+    recorder = active_recorder()
+    if recorder is not None:
+        band_counts = {}
+        best_energy_trajectory = [(start, best_energy)]
+        start_time = time.perf_counter()
 
-    # Count iterations with negligible change.
-    no_change_count = 0
+    if lower_bound is not None:
+        gap = optimality_gap(best_energy, lower_bound)
 
     if individual_logging:
         progress_bar = tqdm(total=iterations)
+        if lower_bound is not None:
+            progress_bar.set_postfix(gap=f'{gap:.4f}')
 
-    for it in range(iterations):
+    it = start
+    for it in range(start, start + iterations):
         # Propose a new ordering by removing one element and inserting it elsewhere.
         new_order = current_order.copy()
         i = np.random.randint(0, n)
@@ -109,7 +149,14 @@ def simulated_annealing_ordering(
         delta_E = new_energy - current_energy
 
         # Accept new ordering if energy decreases, or with probability exp(-delta_E/temp)
-        if delta_E < 0 or np.random.rand() < np.exp(-delta_E / temp):
+        accepted = delta_E < 0 or np.random.rand() < np.exp(-delta_E / temp)
+
+        if recorder is not None:
+            counts = band_counts.setdefault(temperature_band(temp), [0, 0])
+            counts[0] += 1
+            counts[1] += accepted
+
+        if accepted:
             current_order = new_order
             current_energy = new_energy
             # Record if we found a new best
@@ -117,6 +164,14 @@ def simulated_annealing_ordering(
                 best_energy = current_energy
                 best_order = current_order.copy()
 
+                if recorder is not None:
+                    best_energy_trajectory.append((it, best_energy))
+
+                if lower_bound is not None:
+                    gap = optimality_gap(best_energy, lower_bound)
+                    if individual_logging:
+                        progress_bar.set_postfix(gap=f'{gap:.4f}', refresh=False)
+
         energy_history.append(current_energy)
         # Cool down the temperature
         temp *= cooling_rate
@@ -128,6 +183,12 @@ def simulated_annealing_ordering(
 
         if no_change_count >= patience:
             logging.info(f"Converged at iteration {it}")
+            converged = True
+            break
+
+        if gap_tol is not None and lower_bound is not None and gap <= gap_tol:
+            logging.info(f"Optimality gap {gap:.4f} within tolerance at iteration {it}")
+            converged = True
             break
 
         if individual_logging:
@@ -136,7 +197,29 @@ def simulated_annealing_ordering(
     if individual_logging:
         progress_bar.close()
 
-    if return_history:
-        return best_order, best_energy, it or 0, energy_history
+    if recorder is not None:
+        recorder.record_annealer(
+            iterations=it + 1 - start,
+            wall_time=time.perf_counter() - start_time,
+            band_counts=band_counts,
+            best_energy_trajectory=best_energy_trajectory,
+        )
+
+    result = (best_order, best_energy, it or 0)
 
-    return best_order, best_energy, it or 0
+    if return_history:
+        result += (energy_history,)
+
+    if return_state:
+        result += ({
+            'current_order': current_order,
+            'current_energy': current_energy,
+            'best_order': best_order,
+            'best_energy': best_energy,
+            'temp': temp,
+            'no_change_count': no_change_count,
+            'iteration': it + 1,
+            'converged': converged,
+        },)
+
+    return result
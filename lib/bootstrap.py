@@ -0,0 +1,152 @@
+import logging
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from lib.annealing import simulated_annealing_ordering
+from lib.telemetry import active_recorder, instrument, start_recording, stop_recording
+
+
+def block_bootstrap_indices(n_observations, block_length, n_resamples, seed=None):
+    """
+    Moving block bootstrap row indices.
+
+    Each resample is built from randomly placed blocks of block_length consecutive
+    days, which keeps the short-range autocorrelation of the returns.
+
+    Returns an (n_resamples, n_observations) integer array.
+    """
+    rng = np.random.default_rng(seed)
+    block_length = min(block_length, n_observations)
+    n_blocks = -(-n_observations // block_length)
+
+    starts = rng.integers(0, n_observations - block_length + 1, size=(n_resamples, n_blocks))
+    indices = starts[:, :, None] + np.arange(block_length)
+    return indices.reshape(n_resamples, -1)[:, :n_observations]
+
+
+def batched_correlation_matrices(returns, indices, batch_size=8):
+    """
+    Correlation matrices of many resamples of returns, computed as stacked matmuls.
+
+    returns : (T, n) array of returns.
+    indices : (B, T) array of row indices, e.g. from block_bootstrap_indices.
+
+    Returns a (B, n, n) array. Resamples are processed batch_size at a time to
+    bound the memory taken by the (batch_size, T, n) resampled returns.
+    """
+    n_resamples, n_observations = indices.shape
+    n = returns.shape[1]
+    correlations = np.empty((n_resamples, n, n))
+
+    for start in range(0, n_resamples, batch_size):
+        X = returns[indices[start:start + batch_size]]
+        X = X - X.mean(axis=1, keepdims=True)
+        covariance = np.matmul(X.transpose(0, 2, 1), X) / (n_observations - 1)
+        std = np.sqrt(np.diagonal(covariance, axis1=1, axis2=2))
+        correlations[start:start + batch_size] = covariance / (std[:, :, None] * std[:, None, :])
+
+    return correlations
+
+
+def batched_group_modes(correlations, N_g):
+    """Group mode matrices C_g for a (B, n, n) stack, as compute_group_modes does for one matrix."""
+    eigenvalues, eigenvectors = np.linalg.eigh(correlations)
+
+    # eigh sorts ascending, so the market mode is last and the group modes precede it
+    group_values = eigenvalues[:, -N_g:-1]
+    group_vectors = eigenvectors[:, :, -N_g:-1]
+
+    return np.matmul(group_vectors * group_values[:, None, :], group_vectors.transpose(0, 2, 1))
+
+
+def _anneal_resample(args):
+    C_g, initial_order, seed, record, annealing_kwargs = args
+    np.random.seed(seed)
+
+    # Forked workers inherit a copy of the parent's recorder; replace it with a fresh one
+    # whose annealer runs are sent back, or drop it if the parent is not recording
+    inherited = stop_recording()
+    if inherited is not None and inherited.trace_memory:
+        tracemalloc.stop()
+    recorder = start_recording() if record else None
+
+    best_order, best_energy, _ = simulated_annealing_ordering(C_g, initial_order=initial_order, **annealing_kwargs)
+
+    annealer_runs = stop_recording().annealer_runs if recorder is not None else []
+    return best_order, best_energy, annealer_runs
+
+
+@instrument
+def bootstrap_orderings(
+        returns,
+        full_order,
+        N_g,
+        n_resamples=50,
+        block_length=20,
+        batch_size=8,
+        n_jobs=None,
+        seed=42,
+        **annealing_kwargs,
+):
+    """
+    Anneal block-bootstrap resamples of the returns, warm-started from the full-sample order.
+
+    returns          : (T, n) array of returns.
+    full_order       : ordering found on the full sample.
+    N_g              : number of modes used for C_g (market mode included).
+    n_resamples      : number of bootstrap resamples.
+    block_length     : length in days of each bootstrap block.
+    batch_size       : resamples per batched correlation / eigendecomposition step.
+    n_jobs           : worker processes for annealing, defaults to the CPU count.
+    annealing_kwargs : passed to simulated_annealing_ordering (cutoff, initial_temp, ...).
+
+    Returns:
+    orders   : (n_resamples, n) array of bootstrap orderings.
+    energies : (n_resamples,) array of their energies.
+    """
+    recorder = active_recorder()
+    indices = block_bootstrap_indices(returns.shape[0], block_length, n_resamples, seed=seed)
+
+    tasks = []
+    for start in range(0, n_resamples, batch_size):
+        correlations = batched_correlation_matrices(returns, indices[start:start + batch_size], batch_size=batch_size)
+        group_matrices = batched_group_modes(correlations, N_g)
+        for offset, C_g in enumerate(group_matrices):
+            tasks.append((C_g, list(full_order), seed + start + offset, recorder is not None, annealing_kwargs))
+
+    logging.info(f'Annealing {n_resamples} bootstrap resamples')
+    with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+        results = list(executor.map(_anneal_resample, tasks))
+
+    if recorder is not None:
+        for _, _, annealer_runs in results:
+            recorder.annealer_runs.extend(annealer_runs)
+
+    orders = np.array([order for order, _, _ in results])
+    energies = np.array([energy for _, energy, _ in results])
+    return orders, energies
+
+
+def position_stability(full_order, orders):
+    """
+    Per-stock position statistics across bootstrap orderings.
+
+    Returns a dict of (n,) arrays indexed by stock: its full-sample position, the
+    mean and standard deviation of its bootstrap position, and its mean absolute
+    displacement from the full-sample position.
+    """
+    n = len(full_order)
+    full_positions = np.empty(n, dtype=int)
+    full_positions[np.asarray(full_order)] = np.arange(n)
+
+    positions = np.empty_like(orders)
+    np.put_along_axis(positions, orders, np.arange(n)[None, :].repeat(len(orders), axis=0), axis=1)
+
+    return {
+        'full_position': full_positions,
+        'mean_position': positions.mean(axis=0),
+        'std_position': positions.std(axis=0),
+        'mean_displacement': np.abs(positions - full_positions).mean(axis=0),
+    }
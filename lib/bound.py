@@ -0,0 +1,69 @@
+import numpy as np
+
+
+def thresholded_matrix(C, cutoff):
+    """Correlations above the cutoff, zero elsewhere (including the diagonal)."""
+    W = np.where(C > cutoff, C, 0.0)
+    np.fill_diagonal(W, 0.0)
+    return W
+
+
+def _negative_lower_bound(W):
+    """Pairs with negative weight cost at least weight * (n - 1)."""
+    n = W.shape[0]
+    return 0.5 * np.clip(W, None, 0.0).sum() * (n - 1)
+
+
+def degree_lower_bound(C, cutoff):
+    """
+    Lower bound from each stock's best possible neighbourhood.
+
+    A stock has at most two neighbours at every distance, so its row of the
+    thresholded matrix costs at least the weights sorted in descending order
+    times distances 1, 1, 2, 2, 3, .... Every pair is counted from both ends,
+    hence the half. Negative weights (cutoff < 0) are bounded separately.
+    """
+    W = thresholded_matrix(C, cutoff)
+    n = W.shape[0]
+
+    positive = -np.sort(-np.clip(W, 0.0, None), axis=1)
+    distances = np.arange(n) // 2 + 1
+
+    return 0.5 * (positive @ distances).sum() + _negative_lower_bound(W)
+
+
+def spectral_lower_bound(C, cutoff):
+    """
+    Lower bound from the Fiedler value of the thresholded graph.
+
+    For positions p (a permutation of 0..n-1), sum w (p_i - p_j)^2 >= lambda_2 * n(n^2 - 1)/12,
+    and |p_i - p_j| >= (p_i - p_j)^2 / (n - 1), giving lambda_2 * n(n + 1)/12.
+    Negative weights are bounded separately, as in degree_lower_bound.
+    """
+    W = thresholded_matrix(C, cutoff)
+    n = W.shape[0]
+
+    if n < 2:
+        return 0.0
+
+    positive = np.clip(W, 0.0, None)
+    laplacian = np.diag(positive.sum(axis=1)) - positive
+    eigenvalues = np.linalg.eigvalsh(laplacian)
+    fiedler_value = max(eigenvalues[1], 0.0)
+
+    return fiedler_value * n * (n + 1) / 12 + _negative_lower_bound(W)
+
+
+def ordering_lower_bound(C, cutoff):
+    """Best available lower bound on energy(order, C, cutoff) over all orderings."""
+    return max(degree_lower_bound(C, cutoff), spectral_lower_bound(C, cutoff))
+
+
+def optimality_gap(energy, lower_bound):
+    """Relative gap between an energy and a lower bound, 0 when the bound is met."""
+    if energy <= lower_bound:
+        return 0.0
+    if energy == 0:
+        # Only possible with a negative bound (cutoff < 0); no relative gap is defined
+        return np.inf
+    return (energy - lower_bound) / abs(energy)
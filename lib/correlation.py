@@ -1,14 +1,19 @@
 import numpy as np
 
+from lib.telemetry import instrument
 
+
+@instrument
 def compute_correlation_matrix(timeseries_data):
     return np.corrcoef(timeseries_data, rowvar=False)
 
 
+@instrument
 def compute_covariance_matrix(timeseries_data):
     return np.cov(timeseries_data, rowvar=False)
 
 
+@instrument
 def compute_eigenvalues(matrix, sort=True):
     eigenvalues, eigenvectors = np.linalg.eig(matrix)
 
@@ -32,6 +37,7 @@ def compute_market_mode(eigenvalues, eigenvectors):
     return eigenvalues[0] * np.outer(eigenvectors[:, 0], eigenvectors[:, 0])
 
 
+@instrument
 def compute_group_modes(eigenvalues, eigenvectors, N_g):
     return sum(eigenvalues[i] * np.outer(eigenvectors[:, i], eigenvectors[:, i]) for i in range(1, N_g))
 
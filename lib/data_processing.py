@@ -5,7 +5,10 @@ import pandas as pd
 import yfinance
 from matplotlib import pyplot as plt
 
+from lib.telemetry import instrument
 
+
+@instrument
 def check_data(
         data_path: str,
         save_path: str,
@@ -150,6 +153,7 @@ def check_data(
     return accept_data, filtered_stock_info
 
 
+@instrument
 def fetch_data(
         sector_stock_count: int = 50,
         total_count: int = None,
@@ -1,8 +1,11 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
 import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
 
-from lib.utils import normalise, find_best_energies
+from lib.utils import normalise, find_best_energies, sector_array
 
 
 def plot_energy_history(energy_history, output_dir):
@@ -22,26 +25,63 @@ def plot_energy_history(energy_history, output_dir):
     plt.close()
 
 
-def plot_heat_map(C_g, best_order, stock_mapping, sector_mapping, output_dir):
-    Cg_sorted = C_g[np.ix_(best_order, best_order)]
+def sector_position_index(best_order, sector_mapping):
+    """Positions in best_order occupied by each sector, as a dict of sorted position arrays."""
+    ordered_sectors = sector_array(sector_mapping)[np.asarray(best_order)]
+    sectors, codes = np.unique(ordered_sectors, return_inverse=True)
+    positions = np.argsort(codes, kind='stable')
+    splits = np.cumsum(np.bincount(codes, minlength=len(sectors)))[:-1]
+
+    return dict(zip(sectors.tolist(), np.split(positions, splits)))
+
+
+def downsample_matrix(matrix, max_pixels):
+    """Block-average a square matrix so each side has at most max_pixels entries."""
+    factor = -(-matrix.shape[0] // max_pixels) if max_pixels else 1
+    if factor <= 1:
+        return matrix
+
+    # Pad to a multiple of factor so the trailing stocks are kept and the image spans all n positions
+    size = -(-matrix.shape[0] // factor)
+    padded = np.full((size * factor, size * factor), np.nan)
+    padded[:matrix.shape[0], :matrix.shape[1]] = matrix
+    return np.nanmean(padded.reshape(size, factor, size, factor), axis=(1, 3))
+
+
+def _show_heat_map(ax, Cg_sorted, max_pixels, origin='upper'):
+    n = len(Cg_sorted)
+    image = downsample_matrix(Cg_sorted, max_pixels)
+
+    # Keep axes in stock positions even when the image is downsampled. Each pixel covers
+    # factor stocks, so the image spans the padded size and the axes are clipped back to n.
+    span = image.shape[0] * -(-n // image.shape[0])
+    extent = (-0.5, span - 0.5, span - 0.5, -0.5) if origin == 'upper' else (-0.5, span - 0.5, -0.5, span - 0.5)
+    im = ax.imshow(image, interpolation='nearest', aspect='auto', vmin=0.05, vmax=0.25, origin=origin, extent=extent)
 
-    # Create a mapping from new positions to sectors
-    position_to_sector = {}
-    for pos, orig_idx in enumerate(best_order):
-        position_to_sector[pos] = sector_mapping[orig_idx]
+    ax.set_xlim(-0.5, n - 0.5)
+    ax.set_ylim((n - 0.5, -0.5) if origin == 'upper' else (-0.5, n - 0.5))
+    return im
 
-    # Group positions by sector
-    sector_positions = {}
-    for pos, sector in position_to_sector.items():
-        if sector not in sector_positions:
-            sector_positions[sector] = []
-        sector_positions[sector].append(pos)
+
+def _finish(output_path, show):
+    plt.savefig(output_path, dpi=300)
+    if show:
+        plt.show()
+    plt.close()
+
+
+def plot_heat_map(C_g, best_order, stock_mapping, sector_mapping, output_dir, sector_positions=None,
+                  max_pixels=None, show=False):
+    Cg_sorted = C_g[np.ix_(best_order, best_order)]
+
+    if sector_positions is None:
+        sector_positions = sector_position_index(best_order, sector_mapping)
 
     # Calculate median position for each sector
     sector_middles = {sector: np.median(positions) for sector, positions in sector_positions.items()}
 
     fig, ax = plt.subplots(figsize=(8, 7), tight_layout=True)
-    im = ax.imshow(Cg_sorted, interpolation='nearest', aspect='auto', vmin=0.05, vmax=0.25)
+    im = _show_heat_map(ax, Cg_sorted, max_pixels)
 
     for sector, middle in sector_middles.items():
         ax.scatter(middle, middle, color='tab:red', marker='x', s=100)
@@ -53,28 +93,18 @@ def plot_heat_map(C_g, best_order, stock_mapping, sector_mapping, output_dir):
     ax.set_ylabel("Stock index (ordered)")
 
     plt.colorbar(im, label='Correlation')
-    # plt.savefig(f'{output_dir}/heat_map.png', dpi=300)
-    plt.show()
-    plt.close()
+    _finish(f'{output_dir}/heat_map.png', show)
 
 
-def plot_heat_map_with_kde(C_g, best_order, stock_mapping, sector_mapping, output_dir):
+def plot_heat_map_with_kde(C_g, best_order, stock_mapping, sector_mapping, output_dir, sector_positions=None,
+                           max_pixels=None, show=False):
     Cg_sorted = C_g[np.ix_(best_order, best_order)]
 
-    # Create a mapping from new positions to sectors
-    position_to_sector = {}
-    for pos, orig_idx in enumerate(best_order):
-        position_to_sector[pos] = sector_mapping[orig_idx]
-
-    # Group positions by sector
-    sector_positions = {}
-    for pos, sector in position_to_sector.items():
-        if sector not in sector_positions:
-            sector_positions[sector] = []
-        sector_positions[sector].append(pos)
+    if sector_positions is None:
+        sector_positions = sector_position_index(best_order, sector_mapping)
 
     fig, ax = plt.subplots(1, 2, figsize=(12, 8), tight_layout=True, width_ratios=[3, 1])
-    im = ax[0].imshow(Cg_sorted, interpolation='nearest', aspect='auto', vmin=0.05, vmax=0.25, origin='lower')
+    im = _show_heat_map(ax[0], Cg_sorted, max_pixels, origin='lower')
 
     for sector, positions in sector_positions.items():
         middle = np.median(positions)
@@ -89,28 +119,18 @@ def plot_heat_map_with_kde(C_g, best_order, stock_mapping, sector_mapping, outpu
     ax[0].set_ylabel("Stock index (ordered)")
 
     plt.colorbar(im, ax=ax[0], label='Correlation')
-    # plt.savefig(f'{output_dir}/heat_map_with_kde.png', dpi=300)
-    plt.show()
-    plt.close()
+    _finish(f'{output_dir}/heat_map_with_kde.png', show)
 
 
-def plot_heat_map_with_boxplot(C_g, best_order, stock_mapping, sector_mapping, output_dir):
+def plot_heat_map_with_boxplot(C_g, best_order, stock_mapping, sector_mapping, output_dir, sector_positions=None,
+                               max_pixels=None, show=False):
     Cg_sorted = C_g[np.ix_(best_order, best_order)]
 
-    # Create a mapping from new positions to sectors
-    position_to_sector = {}
-    for pos, orig_idx in enumerate(best_order):
-        position_to_sector[pos] = sector_mapping[orig_idx]
-
-    # Group positions by sector
-    sector_positions = {}
-    for pos, sector in position_to_sector.items():
-        if sector not in sector_positions:
-            sector_positions[sector] = []
-        sector_positions[sector].append(pos)
+    if sector_positions is None:
+        sector_positions = sector_position_index(best_order, sector_mapping)
 
     fig, ax = plt.subplots(1, 2, figsize=(15, 8), tight_layout=True)
-    im = ax[0].imshow(Cg_sorted, interpolation='nearest', aspect='auto', vmin=0.05, vmax=0.25, origin='lower')
+    im = _show_heat_map(ax[0], Cg_sorted, max_pixels, origin='lower')
 
     box_plot_data = sector_positions
 
@@ -128,9 +148,58 @@ def plot_heat_map_with_boxplot(C_g, best_order, stock_mapping, sector_mapping, o
     ax[0].set_ylabel("Stock index (ordered)")
 
     plt.colorbar(im, ax=ax[0], label='Correlation')
-    # plt.savefig(f'{output_dir}/heat_map_with_boxplot.png', dpi=300)
-    plt.show()
-    plt.close()
+    _finish(f'{output_dir}/heat_map_with_boxplot.png', show)
+
+
+_render_context = {}
+
+
+def _init_renderer(group_matrices, stock_mapping, sector_mapping, max_pixels):
+    plt.switch_backend('Agg')
+    _render_context.update(
+        group_matrices=group_matrices,
+        stock_mapping=stock_mapping,
+        sector_mapping=sector_array(sector_mapping),
+        max_pixels=max_pixels,
+    )
+
+
+def _render_run(run):
+    C_g = _render_context['group_matrices'][run['N_g']]
+    stock_mapping = _render_context['stock_mapping']
+    sector_mapping = _render_context['sector_mapping']
+    max_pixels = _render_context['max_pixels']
+    output_dir = run['output_dir']
+    best_order = run['best_order']
+
+    os.makedirs(output_dir, exist_ok=True)
+    sector_positions = sector_position_index(best_order, sector_mapping)
+
+    for plot in (plot_heat_map, plot_heat_map_with_kde, plot_heat_map_with_boxplot):
+        plot(C_g, best_order, stock_mapping, sector_mapping, output_dir, sector_positions=sector_positions,
+             max_pixels=max_pixels)
+
+    if run.get('energy_history') is not None:
+        plot_energy_history(run['energy_history'], output_dir)
+
+    return output_dir
+
+
+def render_figures(runs, group_matrices, stock_mapping, sector_mapping, max_pixels=1000, n_jobs=None):
+    """
+    Render the heat map figures for many runs in parallel on the Agg backend.
+
+    runs           : list of dicts with 'N_g', 'best_order', 'output_dir' and optionally 'energy_history'.
+    group_matrices : dict mapping N_g to C_g, sent to each worker once rather than with every run.
+    max_pixels     : heat maps larger than this are block-averaged before drawing.
+    n_jobs         : worker processes, defaults to the CPU count.
+    """
+    with ProcessPoolExecutor(
+            max_workers=n_jobs,
+            initializer=_init_renderer,
+            initargs=(group_matrices, stock_mapping, sector_mapping, max_pixels),
+    ) as executor:
+        return list(executor.map(_render_run, runs))
 
 
 def plot_comparison_graph(output, ranges, output_dir, exclude_cut_off=True):
@@ -0,0 +1,185 @@
+import logging
+
+import numpy as np
+from numba import njit
+
+from lib.annealing import energy_numba
+from lib.bound import thresholded_matrix
+from lib.telemetry import instrument
+
+
+@njit
+def cut_profile(order, W):
+    """Weight crossing each gap of the ordering.
+
+    cut[k] is the total weight of pairs with one stock before position k and
+    the other at or after it, so cut[0] = cut[n] = 0 and sum(cut) is the energy.
+    """
+    n = len(order)
+    cut = np.zeros(n + 1)
+    for k in range(n):
+        a = order[k]
+        left = 0.0
+        for p in range(k):
+            left += W[order[p], a]
+        right = 0.0
+        for p in range(k + 1, n):
+            right += W[a, order[p]]
+        cut[k + 1] = cut[k] - left + right
+    return cut
+
+
+@njit
+def _best_insertion(order, W, cut, tabu_until, step, current_energy, best_energy, tol):
+    """Find the best admissible single insertion move in O(n^2).
+
+    Moving the stock at position i changes the energy by the weight crossing the
+    new gap plus its own distances, minus the same terms at the old position.
+    Both are tracked with prefix sums over the stock's row of W, so every target
+    position for a given stock is evaluated in O(n).
+    """
+    n = len(order)
+    prefix = np.zeros(n + 1)
+
+    best_delta = np.inf
+    best_i = -1
+    best_j = -1
+
+    for i in range(n):
+        x = order[i]
+        for p in range(n):
+            prefix[p + 1] = prefix[p] + W[x, order[p]]
+        total = prefix[n]
+
+        # Own contribution when inserted at reduced position 0
+        own = 0.0
+        for p in range(n - 1):
+            q = p if p < i else p + 1
+            own += W[x, order[q]] * (p + 1)
+
+        # Reduced-order positions and cuts coincide with the full ones up to i
+        own_at_i = own
+        for j in range(i):
+            own_at_i += prefix[j] + prefix[j + 1] - total
+        removed = cut[i] - prefix[i] + own_at_i
+
+        aspiration_only = tabu_until[x] > step
+
+        # The reduced order has n - 1 stocks, so there are n insertion points
+        for j in range(n):
+            if j != i:
+                if j <= i:
+                    gap = cut[j] - prefix[j]
+                else:
+                    gap = cut[j + 1] - (total - prefix[j + 1])
+                delta = gap + own - removed
+
+                admissible = not aspiration_only or current_energy + delta < best_energy - tol
+                if admissible and delta < best_delta:
+                    best_delta = delta
+                    best_i = i
+                    best_j = j
+
+            if j == n - 1:
+                break
+
+            # Shift the insertion point one place to the right
+            before = prefix[j] if j <= i else prefix[j + 1]
+            after = prefix[j + 1] if j + 1 <= i else prefix[j + 2]
+            own += before + after - total
+
+    return best_i, best_j, best_delta
+
+
+@njit
+def _move(order, i, j):
+    elem = order[i]
+    if i < j:
+        for p in range(i, j):
+            order[p] = order[p + 1]
+    else:
+        for p in range(i, j, -1):
+            order[p] = order[p - 1]
+    order[j] = elem
+
+
+@njit
+def _tabu_search(order, W, iterations, tabu_tenure, patience, tol):
+    n = len(order)
+    tabu_until = np.zeros(n, dtype=np.int64)
+
+    cut = cut_profile(order, W)
+    current_energy = cut.sum()
+    best_energy = current_energy
+    best_order = order.copy()
+    no_improvement = 0
+
+    moves = 0
+    for it in range(iterations):
+        i, j, delta = _best_insertion(order, W, cut, tabu_until, it, current_energy, best_energy, tol)
+        if i < 0:
+            break
+
+        elem = order[i]
+        _move(order, i, j)
+        tabu_until[elem] = it + 1 + tabu_tenure
+        moves += 1
+
+        # Rebuild the cuts rather than accumulate deltas so the energy cannot drift
+        cut = cut_profile(order, W)
+        current_energy = cut.sum()
+
+        if current_energy < best_energy - tol:
+            best_energy = current_energy
+            best_order[:] = order
+            no_improvement = 0
+        else:
+            no_improvement += 1
+
+        if no_improvement >= patience:
+            break
+
+    return best_order, moves
+
+
+@instrument
+def tabu_insertion_refinement(
+        C,
+        order,
+        cutoff=0.1,
+        iterations=10000,
+        tabu_tenure=10,
+        patience=100,
+        tol=1e-9,
+):
+    """
+    Refine an ordering with best-improvement insertion moves and a tabu list.
+
+    Each step evaluates every single-stock insertion using incremental gains and
+    applies the best one, even if it is uphill. Moved stocks are tabu for
+    tabu_tenure steps unless moving them would beat the best energy found.
+    With tabu_tenure=0 and patience=1 this is a plain descent to a local optimum.
+
+    C            : correlation matrix (assumed symmetric).
+    order        : starting ordering, e.g. best_order from simulated annealing.
+    cutoff       : cutoff value to consider correlations significant.
+    iterations   : maximum number of moves.
+    tabu_tenure  : number of steps a moved stock stays tabu.
+    patience     : stop after this many moves without improving the best energy.
+    tol          : minimum decrease counted as an improvement.
+
+    Returns:
+    best_order   : the refined ordering (a list of indices).
+    best_energy  : energy value corresponding to best_order.
+    moves: number of moves applied.
+    """
+    W = thresholded_matrix(np.asarray(C, dtype=np.float64), cutoff)
+    start = np.array(order, dtype=np.int64)
+    start_energy = energy_numba(start, C, cutoff)
+
+    best_order, moves = _tabu_search(start.copy(), W, iterations, tabu_tenure, patience, tol)
+    best_energy = energy_numba(best_order, C, cutoff)
+
+    logging.info(f"Tabu refinement: energy {start_energy:.4f} -> {best_energy:.4f} in {moves} moves")
+
+    return best_order.tolist(), best_energy, moves
@@ -0,0 +1,73 @@
+import numpy as np
+from numba import njit
+
+from lib.utils import sector_array
+
+
+def sector_codes(sector_map):
+    """Integer sector code per stock index, from a {index: sector} map or a sequence of sectors."""
+    return np.unique(sector_array(sector_map), return_inverse=True)[1].astype(np.int64)
+
+
+@njit
+def _block_metrics(C, order, codes, cutoff):
+    n = len(order)
+    in_block = 0.0
+    off_block = 0.0
+    profile = np.zeros(n)
+
+    for idx_i in range(n):
+        i = order[idx_i]
+        for idx_j in range(idx_i+1, n):
+            j = order[idx_j]
+            if C[i, j] > cutoff:
+                profile[idx_j - idx_i] += C[i, j]
+                if codes[i] == codes[j]:
+                    in_block += C[i, j]
+                else:
+                    off_block += C[i, j]
+
+    runs = 1 if n > 0 else 0
+    for idx in range(1, n):
+        if codes[order[idx]] != codes[order[idx-1]]:
+            runs += 1
+
+    return in_block, off_block, profile, runs
+
+
+def block_diagonal_metrics(C, order, codes, cutoff=0.1, bandwidth_quantile=0.9):
+    """
+    Block-diagonality scores of an ordering, from a single pass over the reordered matrix.
+
+    C        : correlation matrix (for example, the group matrix C_g).
+    order    : ordering of the stocks.
+    codes    : integer sector code per stock, from sector_codes(sector_map).
+    cutoff   : cutoff value to consider correlations significant, as in energy_numba.
+
+    Returns a dict with:
+    energy            : energy of the ordering (same as energy_numba).
+    in_block_mass     : significant correlation between stocks of the same sector.
+    off_block_mass    : significant correlation between stocks of different sectors.
+    in_block_fraction : in_block_mass / (in_block_mass + off_block_mass).
+    sector_runs       : number of contiguous same-sector runs along the ordering.
+    contiguity        : number of sectors / sector_runs, 1 when every sector is one block.
+    bandwidth         : smallest distance from the diagonal holding bandwidth_quantile of the mass.
+    bandwidth_profile : significant correlation mass at each distance from the diagonal.
+    """
+    order = np.asarray(order, dtype=np.int64)
+    in_block, off_block, profile, runs = _block_metrics(C, order, codes, cutoff)
+
+    total = in_block + off_block
+    cumulative = np.cumsum(profile)
+    n_sectors = len(np.unique(codes[order]))
+
+    return {
+        'energy': float(profile @ np.arange(len(profile))),
+        'in_block_mass': in_block,
+        'off_block_mass': off_block,
+        'in_block_fraction': in_block / total if total > 0 else 0.0,
+        'sector_runs': runs,
+        'contiguity': n_sectors / runs if runs > 0 else 0.0,
+        'bandwidth': int(np.searchsorted(cumulative, bandwidth_quantile * total)) if total > 0 else 0,
+        'bandwidth_profile': profile,
+    }
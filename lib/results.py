@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+
+
+def results_to_table(output):
+    """
+    Split a list of run results into a parameter/energy table and an order array.
+
+    output : list of dicts as produced by run_parameter_selection.
+
+    Returns:
+    table  : DataFrame with one row per run and every scalar field as a column.
+    orders : (n_runs, n) int16 array, row i holding the best_order of table row i.
+    """
+    table = pd.DataFrame([{key: value for key, value in result.items() if key != 'best_order'} for result in output])
+    orders = np.array([result['best_order'] for result in output], dtype=np.int16)
+    return table, orders
+
+
+def save_results(output_dir, table, orders):
+    table.to_csv(f'{output_dir}/results.csv', index=False)
+    np.save(f'{output_dir}/best_orders.npy', orders)
+
+
+def load_results(output_dir):
+    """Read back the table and orders written by save_results, checking that their rows line up."""
+    table = pd.read_csv(f'{output_dir}/results.csv')
+    orders = np.load(f'{output_dir}/best_orders.npy')
+
+    if len(table) != len(orders):
+        raise ValueError(f'results.csv has {len(table)} rows but best_orders.npy has {len(orders)}')
+    if not np.array_equal(table['index'].to_numpy(), np.arange(len(table))):
+        raise ValueError("results.csv 'index' column does not match the row order of best_orders.npy")
+
+    return table, orders
+
+
+def best_runs(table, name):
+    """
+    Row of the lowest-energy run for every value of the parameter name, indexed by that value.
+
+    The 'index' column of each row is its row in the orders array.
+    """
+    return table.loc[table.groupby(name)['best_energy'].idxmin()].set_index(name)
@@ -0,0 +1,74 @@
+import logging
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from sklearn.decomposition import SparsePCA
+
+from lib.telemetry import instrument
+
+
+def fit_alpha_path(X, alphas, n_components=2, random_state=42, max_iter=1000):
+    """
+    Fit SparsePCA along a path of alpha values, warm-starting each fit from the previous one.
+
+    X            : (n_samples, n_features) matrix, e.g. a sector correlation matrix.
+    alphas       : sparsity penalties in the order they are fitted (larger alpha => more sparsity).
+
+    Returns a (len(alphas), n_components, n_features) array of component matrices.
+    """
+    X = np.asarray(X, dtype=np.float64)
+    X_centered = X - X.mean(axis=0)
+
+    components = np.empty((len(alphas), n_components, X.shape[1]))
+    U_init, V_init = None, None
+
+    for index, alpha in enumerate(alphas):
+        spca = SparsePCA(
+            n_components=n_components,
+            alpha=alpha,
+            random_state=random_state,
+            max_iter=max_iter,
+            U_init=U_init,
+            V_init=V_init,
+        )
+        spca.fit(X)
+        components[index] = spca.components_
+
+        # Loadings that reproduce X with the (normalised) components as the next starting point
+        V_init = spca.components_
+        U_init = np.linalg.lstsq(V_init.T, X_centered.T, rcond=None)[0].T
+
+    return components
+
+
+def _fit_sector(args):
+    sector, X, alphas, n_components, random_state, max_iter = args
+    logging.info(f'Fitting sparse PCA path for sector {sector}')
+    return sector, fit_alpha_path(X, alphas, n_components, random_state, max_iter)
+
+
+@instrument
+def fit_sector_alpha_paths(sector_matrices, alphas, n_components=2, random_state=42, max_iter=1000, n_jobs=None):
+    """
+    Fit an alpha path for every sector concurrently in a process pool.
+
+    sector_matrices : dict mapping sector name to its (n_samples, n_features) matrix.
+    n_jobs          : worker processes, defaults to the CPU count.
+
+    Returns a dict mapping sector name to its (len(alphas), n_components, n_features) components.
+    """
+    tasks = [(sector, X, alphas, n_components, random_state, max_iter) for sector, X in sector_matrices.items()]
+
+    with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+        return dict(executor.map(_fit_sector, tasks))
+
+
+def save_alpha_paths(output_dir, alpha_paths, alphas, sector_stocks):
+    """Save each sector's component path to sparse_pca_{sector}.npz with its alphas and stock symbols."""
+    for sector, components in alpha_paths.items():
+        np.savez(
+            f'{output_dir}/sparse_pca_{sector}.npz',
+            alphas=np.asarray(alphas),
+            components=components,
+            stocks=np.asarray(sector_stocks[sector]),
+        )
@@ -0,0 +1,153 @@
+import csv
+import functools
+import json
+import logging
+import math
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+
+_recorder = None
+
+
+def _max_rss_mb():
+    if resource is None:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes on Linux
+    if sys.platform == 'darwin':
+        return max_rss / 1024 ** 2
+    return max_rss / 1024
+
+
+class Recorder:
+    """
+    Collects per-stage timings and annealer statistics for one run.
+
+    Stage records hold wall time, the process high-water RSS at the end of the
+    stage and how far the stage raised it, and, if trace_memory is set, the peak
+    Python/NumPy allocation during the stage (tracemalloc slows allocation-heavy
+    code, so it is off by default).
+    """
+
+    def __init__(self, trace_memory=False):
+        self.trace_memory = trace_memory
+        self.stages = []
+        self.annealer_runs = []
+        self._start = time.perf_counter()
+        self._peaks = []
+
+        if trace_memory:
+            tracemalloc.start()
+
+    @contextmanager
+    def stage(self, name):
+        if self.trace_memory:
+            if self._peaks:
+                self._peaks[-1] = max(self._peaks[-1], tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+            self._peaks.append(0)
+
+        start_rss_mb = _max_rss_mb()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            wall_time = time.perf_counter() - start
+            max_rss_mb = _max_rss_mb()
+
+            peak_traced_mb = None
+            if self.trace_memory:
+                peak = max(self._peaks.pop(), tracemalloc.get_traced_memory()[1])
+                if self._peaks:
+                    self._peaks[-1] = max(self._peaks[-1], peak)
+                peak_traced_mb = peak / 1024 ** 2
+
+            self.stages.append({
+                'stage': name,
+                'start': start - self._start,
+                'wall_time': wall_time,
+                'max_rss_mb': max_rss_mb,
+                'max_rss_increase_mb': max_rss_mb - start_rss_mb if max_rss_mb is not None else None,
+                'peak_traced_mb': peak_traced_mb,
+            })
+            logging.debug(f'Stage {name} took {wall_time:.3f}s')
+
+    def record_annealer(self, iterations, wall_time, band_counts, best_energy_trajectory):
+        self.annealer_runs.append({
+            'iterations': iterations,
+            'wall_time': wall_time,
+            'iterations_per_second': iterations / wall_time if wall_time > 0 else None,
+            'acceptance_rate': {
+                f'1e{band}': accepted / proposed for band, (proposed, accepted) in sorted(band_counts.items(), reverse=True)
+            },
+            'best_energy_trajectory': best_energy_trajectory,
+        })
+
+    def write(self, output_dir):
+        """Write telemetry.json (everything) and stages.csv (stage table) to output_dir."""
+        with open(f'{output_dir}/telemetry.json', 'w') as f:
+            json.dump({
+                'total_wall_time': time.perf_counter() - self._start,
+                'stages': self.stages,
+                'annealer_runs': self.annealer_runs,
+            }, f)
+
+        with open(f'{output_dir}/stages.csv', 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=['stage', 'start', 'wall_time', 'max_rss_mb', 'max_rss_increase_mb', 'peak_traced_mb'])
+            writer.writeheader()
+            writer.writerows(self.stages)
+
+        if self.trace_memory:
+            tracemalloc.stop()
+
+
+def start_recording(trace_memory=False):
+    """Start recording telemetry for instrumented functions and return the recorder."""
+    global _recorder
+    _recorder = Recorder(trace_memory=trace_memory)
+    return _recorder
+
+
+def stop_recording():
+    global _recorder
+    recorder, _recorder = _recorder, None
+    return recorder
+
+
+def active_recorder():
+    """The recorder started by start_recording, or None if telemetry is off."""
+    return _recorder
+
+
+@contextmanager
+def stage(name):
+    """Time a block as a named stage; a no-op when telemetry is off."""
+    if _recorder is None:
+        yield
+    else:
+        with _recorder.stage(name):
+            yield
+
+
+def instrument(func):
+    """Record every call to func as a stage named after it."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if _recorder is None:
+            return func(*args, **kwargs)
+        with _recorder.stage(func.__name__):
+            return func(*args, **kwargs)
+    return wrapper
+
+
+def temperature_band(temp):
+    """Decade of the annealing temperature, used to bin acceptance rates."""
+    return math.floor(math.log10(temp)) if temp > 0 else -math.inf
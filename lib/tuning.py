@@ -0,0 +1,103 @@
+import logging
+import math
+
+from tqdm import tqdm
+
+from lib.annealing import simulated_annealing_ordering
+from lib.telemetry import instrument
+
+
+@instrument
+def successive_halving(
+        group_matrices,
+        combinations,
+        min_iterations=2000,
+        max_iterations=200000,
+        eta=3,
+        tol=10,
+        patience=1000,
+):
+    """
+    Successive-halving sweep over annealing parameters.
+
+    Every combination is annealed for min_iterations, then the best 1/eta of them
+    are continued from their saved annealer state until they reach eta times the
+    budget, and so on up to max_iterations. Runs that converge early keep their
+    result but are not continued.
+
+    Energies are only comparable for the same C_g and cutoff, so combinations are
+    ranked and halved separately within each (N_g, cut_off) group.
+
+    group_matrices : dict mapping N_g to the group matrix C_g.
+    combinations   : list of (N_g, initial_temperature, cooling_rate, cut_off) tuples.
+    min_iterations : iteration budget of the first rung.
+    max_iterations : iteration budget of the last rung.
+    eta            : factor by which the budget grows and the survivors shrink each rung.
+
+    Returns:
+    output: one dict per combination, in the same format as run_parameter_selection,
+            with 'rung' recording the last rung each combination reached.
+    """
+    output = [
+        {
+            'index': index,
+            'best_energy': None,
+            'iteration': 0,
+            'N_g': N_g,
+            'initial_temperature': initial_temperature,
+            'cooling_rate': cooling_rate,
+            'cut_off': cut_off,
+            'best_order': None,
+            'rung': 0,
+        }
+        for index, (N_g, initial_temperature, cooling_rate, cut_off) in enumerate(combinations)
+    ]
+    states = [None] * len(output)
+
+    survivors = list(range(len(output)))
+    budget = min(min_iterations, max_iterations)
+    rung = 0
+
+    while survivors:
+        logging.info(f'Successive halving rung {rung}: {len(survivors)} combinations, budget {budget} iterations')
+
+        for index in tqdm(survivors):
+            result = output[index]
+            result['rung'] = rung
+            remaining = budget - (states[index]['iteration'] if states[index] else 0)
+            if remaining <= 0:
+                continue
+
+            best_order, best_energy, iteration_count, states[index] = simulated_annealing_ordering(
+                group_matrices[result['N_g']],
+                cutoff=result['cut_off'],
+                initial_temp=result['initial_temperature'],
+                cooling_rate=result['cooling_rate'],
+                iterations=remaining,
+                tol=tol,
+                patience=patience,
+                state=states[index],
+                return_state=True,
+            )
+
+            result['best_energy'] = best_energy
+            result['iteration'] = iteration_count
+            result['best_order'] = best_order
+
+        if budget >= max_iterations:
+            break
+
+        groups = {}
+        for index in survivors:
+            if not states[index]['converged']:
+                groups.setdefault((output[index]['N_g'], output[index]['cut_off']), []).append(index)
+
+        survivors = []
+        for group in groups.values():
+            ranked = sorted(group, key=lambda x: output[x]['best_energy'])
+            survivors += ranked[:max(1, math.ceil(len(ranked) / eta))]
+
+        budget = min(budget * eta, max_iterations)
+        rung += 1
+
+    return output
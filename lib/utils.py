@@ -2,8 +2,13 @@ import os
 from glob import glob
 
 import numpy as np
+import pandas as pd
 
+from lib.results import best_runs
+from lib.telemetry import instrument
 
+
+@instrument
 def compute_log_returns(price_data, as_dataframe=False):
     returns = np.log(price_data / price_data.shift(1))
     returns.dropna(inplace=True)
@@ -17,15 +22,18 @@ def normalise(x):
     return (x-np.min(x))/(np.max(x)-np.min(x))
 
 
-def find_best_energies(all_data, values, name):
-    best_energies = []
+def sector_array(sector_mapping):
+    """Sector of every stock as an array indexed by stock, from a {index: sector} map or a sequence."""
+    if isinstance(sector_mapping, dict):
+        sector_mapping = [sector_mapping[i] for i in range(len(sector_mapping))]
+    return np.asarray(sector_mapping)
 
-    for value in values:
-        filtered_data = [x for x in all_data if x[name] == value]
-        best_energy = filtered_data[np.argmin([x['best_energy'] for x in filtered_data])]['best_energy']
-        best_energies.append(best_energy)
 
-    return best_energies
+def find_best_energies(all_data, values, name):
+    if not isinstance(all_data, pd.DataFrame):
+        all_data = pd.DataFrame(all_data)
+
+    return best_runs(all_data, name)['best_energy'].reindex(values).to_list()
 
 
 def create_output_folder(output_dir, folder_name='tuning'):
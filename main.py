@@ -1,5 +1,6 @@
 import logging
 
+from bootstrap_stability import run_bootstrap_stability
 from group_correlation_test import run_group_correlation
 from parameter_selection import run_parameter_selection
 from sparse_pca import run_sparse_pca
@@ -11,4 +12,5 @@ logging.getLogger().setLevel(logging.INFO)
 if __name__ == '__main__':
     # run_sparse_pca()
     # run_group_correlation()
+    # run_bootstrap_stability()
     run_parameter_selection()
\ No newline at end of file
@@ -7,10 +7,15 @@ from lib.annealing import simulated_annealing_ordering
 from lib.correlation import *
 from lib.data_processing import *
 from lib.graphs import *
+from lib.metrics import block_diagonal_metrics, sector_codes
+from lib.results import best_runs, results_to_table, save_results
+from lib.telemetry import start_recording, stage, stop_recording
+from lib.tuning import successive_halving
 from lib.utils import *
 
 
-def run_parameter_selection():
+def run_parameter_selection(halving=False, render=False, trace_memory=False):
+    recorder = start_recording(trace_memory=trace_memory)
 
     tuning_folder = create_output_folder('./output', 'tuning')
 
@@ -55,38 +60,78 @@ def run_parameter_selection():
 
     output = []
 
-    try:
-        for index, (N_g, initial_temperature, cooling_rate, cut_off) in tqdm(enumerate(itertools.product(N_g_values, initial_temperatures, cooling_rates, cut_offs)), total=combinations):
-            logging.info(f'Running parameter selection for N_g={N_g}, initial_temperature={initial_temperature}, cooling_rate={cooling_rate}, cut_off={cut_off}')
-
-            C_g = compute_group_modes(corr_eigenvalues, corr_eigenvectors, N_g)
-            best_order, best_energy, iteration_count = simulated_annealing_ordering(
-                C_g,
-                cutoff=cut_off,
-                initial_temp=initial_temperature,
-                cooling_rate=cooling_rate,
-                iterations=200000,
-                tol=10,
-                patience=1000,
-                return_history=False,
-            )
-
-            output.append({
-                'index': index,
-                'best_energy': best_energy,
-                'iteration': iteration_count,
-                'N_g': N_g,
-                'initial_temperature': initial_temperature,
-                'cooling_rate': cooling_rate,
-                'cut_off': cut_off,
-                'best_order': best_order,
-            })
-
-    except Exception as e:
-        logging.error(f'Error: {e}')
-
-    plot_comparison_graph(output, ranges, tuning_folder, exclude_cut_off=False)
-
-    logging.info(f'Saving output to JSON')
-    with open(f'{tuning_folder}/parameter_selection_output.json', 'w') as f:
-        json.dump(output, f)
+    group_matrices = {N_g: compute_group_modes(corr_eigenvalues, corr_eigenvectors, N_g) for N_g in N_g_values}
+
+    if halving:
+        output = successive_halving(
+            group_matrices,
+            list(itertools.product(N_g_values, initial_temperatures, cooling_rates, cut_offs)),
+            min_iterations=2000,
+            max_iterations=200000,
+            eta=3,
+            tol=10,
+            patience=1000,
+        )
+
+    else:
+        try:
+            for index, (N_g, initial_temperature, cooling_rate, cut_off) in tqdm(enumerate(itertools.product(N_g_values, initial_temperatures, cooling_rates, cut_offs)), total=combinations):
+                logging.info(f'Running parameter selection for N_g={N_g}, initial_temperature={initial_temperature}, cooling_rate={cooling_rate}, cut_off={cut_off}')
+
+                C_g = group_matrices[N_g]
+                best_order, best_energy, iteration_count = simulated_annealing_ordering(
+                    C_g,
+                    cutoff=cut_off,
+                    initial_temp=initial_temperature,
+                    cooling_rate=cooling_rate,
+                    iterations=200000,
+                    tol=10,
+                    patience=1000,
+                    return_history=False,
+                )
+
+                output.append({
+                    'index': index,
+                    'best_energy': best_energy,
+                    'iteration': iteration_count,
+                    'N_g': N_g,
+                    'initial_temperature': initial_temperature,
+                    'cooling_rate': cooling_rate,
+                    'cut_off': cut_off,
+                    'best_order': best_order,
+                })
+
+        except Exception as e:
+            logging.error(f'Error: {e}')
+
+    # Block-diagonality scores for every run, alongside its energy
+    codes = sector_codes(stock_info['Sector'].to_list())
+    for result in output:
+        metrics = block_diagonal_metrics(group_matrices[result['N_g']], result['best_order'], codes, cutoff=result['cut_off'])
+        metrics.pop('bandwidth_profile')
+        metrics.pop('energy')
+        result.update(metrics)
+
+    table, orders = results_to_table(output)
+
+    with stage('plotting'):
+        plot_comparison_graph(table, ranges, tuning_folder, exclude_cut_off=False)
+
+    logging.info(f'Saving results table and orders')
+    save_results(tuning_folder, table, orders)
+
+    if render:
+        stocks_map = {index: stock for index, stock in enumerate(stock_info['Symbol'].str.lower().to_list())}
+        sector_map = {index: sector for index, sector in enumerate(stock_info['Sector'].to_list())}
+        # Draw the best run for every value of every swept parameter
+        best_indices = sorted({index for name in ranges for index in best_runs(table, name)['index']})
+        runs = [
+            {'N_g': table['N_g'][index], 'best_order': orders[index], 'output_dir': f'{tuning_folder}/figures/run_{index}'}
+            for index in best_indices
+        ]
+
+        with stage('rendering'):
+            render_figures(runs, group_matrices, stocks_map, sector_map, max_pixels=1000)
+
+    stop_recording()
+    recorder.write(tuning_folder)
@@ -1,14 +1,16 @@
 import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
-from sklearn.decomposition import SparsePCA
 
 from lib.correlation import compute_correlation_matrix
 from lib.data_processing import fetch_data
+from lib.sparse_components import fit_sector_alpha_paths, save_alpha_paths
+from lib.telemetry import start_recording, stop_recording
 from lib.utils import create_output_folder, compute_log_returns
 
 
-def run_sparse_pca():
+def run_sparse_pca(trace_memory=False):
+    recorder = start_recording(trace_memory=trace_memory)
 
     output_folder = create_output_folder('./output', 'graphing')
 
@@ -29,26 +31,35 @@ def run_sparse_pca():
     target_sectors = ['Energy', 'Technology', 'Telecommunications']
     stock_info = stock_info[stock_info['Sector'].isin(target_sectors)]
 
+    n_sparse_components = 2
+    # Larger alpha => more sparsity. Each fit starts from the previous alpha's solution.
+    alphas = [0.1, 0.2, 0.4, 0.6, 0.8, 1.0, 1.5, 2.0, 3.0]
+    plot_alpha = 0.8
+
+    sector_stocks = {}
+    sector_correlations = {}
     for sector, sector_data in stock_info.groupby('Sector'):
-        sector_stocks = sector_data['Symbol'].str.lower().to_list()
-        sector_prices = prices[sector_stocks]
+        sector_stocks[sector] = sector_data['Symbol'].str.lower().to_list()
+        sector_prices = prices[sector_stocks[sector]]
 
         log_returns = compute_log_returns(sector_prices)
+        sector_correlations[sector] = compute_correlation_matrix(log_returns)
 
-        correlation = compute_correlation_matrix(log_returns)
-        correlation_df = pd.DataFrame(correlation, index=sector_stocks, columns=sector_stocks)
-
-        n_sparse_components = 2
-        alpha = 0.8  # Larger alpha => more sparsity
-
-        spca = SparsePCA(n_components=n_sparse_components, alpha=alpha, random_state=42, max_iter=1000)
-        spca.fit(correlation_df)
+    alpha_paths = fit_sector_alpha_paths(
+        sector_correlations,
+        alphas,
+        n_components=n_sparse_components,
+        random_state=42,
+        max_iter=1000,
+    )
+    save_alpha_paths(output_folder, alpha_paths, alphas, sector_stocks)
 
-        sparse_components = spca.components_
+    for sector, components in alpha_paths.items():
+        sparse_components = components[alphas.index(plot_alpha)]
         component_df = pd.DataFrame(
             sparse_components,
             index=[f"Comp {i+1}" for i in range(n_sparse_components)],
-            columns=sector_stocks
+            columns=sector_stocks[sector]
         )
 
         plt.figure(figsize=(12, 6))
@@ -68,6 +79,9 @@ def run_sparse_pca():
         plt.show()
         plt.close()
 
+    stop_recording()
+    recorder.write(output_folder)
+
 
 if __name__ == '__main__':
     run_sparse_pca()
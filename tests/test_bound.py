@@ -0,0 +1,25 @@
+import itertools
+
+import numpy as np
+
+from lib.annealing import energy_numba
+from lib.bound import optimality_gap, ordering_lower_bound
+
+
+def test_lower_bound_never_exceeds_minimum_energy():
+    rng = np.random.default_rng(0)
+    n = 6
+    orders = [np.array(order) for order in itertools.permutations(range(n))]
+
+    for _ in range(50):
+        A = rng.normal(size=(n, n)) / 3
+        C = (A + A.T) / 2
+
+        for cutoff in (0.1, 0.0, -0.2):
+            minimum = min(energy_numba(order, C, cutoff) for order in orders)
+            assert ordering_lower_bound(C, cutoff) <= minimum + 1e-9
+
+
+def test_optimality_gap_at_zero_energy():
+    assert optimality_gap(0.0, 0.0) == 0.0
+    assert optimality_gap(0.0, -1.0) == np.inf
@@ -0,0 +1,27 @@
+import numpy as np
+
+from lib.annealing import energy_numba
+from lib.local_search import tabu_insertion_refinement
+
+
+def test_plain_descent_reaches_insertion_local_optimum():
+    rng = np.random.default_rng(0)
+    n = 12
+
+    for _ in range(200):
+        A = rng.normal(size=(n, n)) / 3
+        C = (A + A.T) / 2
+        order, energy, _ = tabu_insertion_refinement(C, rng.permutation(n), cutoff=0.1, tabu_tenure=0, patience=1)
+
+        assert np.isclose(energy, energy_numba(np.array(order), C, 0.1))
+        for i in range(n):
+            for j in range(n):
+                if i != j:
+                    moved = list(order)
+                    moved.insert(j, moved.pop(i))
+                    assert energy_numba(np.array(moved), C, 0.1) >= energy - 1e-9
+
+
+def test_no_moves_for_single_stock():
+    order, energy, moves = tabu_insertion_refinement(np.ones((1, 1)), [0])
+    assert order == [0] and moves == 0